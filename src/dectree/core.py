@@ -2,19 +2,361 @@ import os
 import sys
 import json
 import argparse
+import uuid
+import queue
 import zipfile
 import logging
+import threading
 import requests
 import tempfile
 import jdatetime
 import numpy as np
-from osgeo import gdal, ogr
+from osgeo import gdal, gdal_array, ogr, osr
 from datetime import datetime
+from functools import lru_cache
+from scipy import ndimage
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter, Retry
 from requests.exceptions import HTTPError
+from requests_toolbelt import MultipartEncoder
 
+from .kernel import change_masks, assign_labels
+
+
+
+
+# Per-process scratch arrays, keyed by name; consecutive CHMAPs usually share
+# the same window size, so the big allocations survive from tile to tile
+_scratch = {}
+
+# The projection every CHMAP is brought into before processing
+_TARGET_SRS = osr.SpatialReference()
+_TARGET_SRS.ImportFromEPSG(3857)
+
+# How many block windows may be in flight between the reader thread and the
+# compute stage before the reader blocks
+_PIPELINE_DEPTH = 4
+
+# Radius-5 disk matching the euclidean MAXDIST=5 buffer the old
+# gdal.ComputeProximity call used
+_yy, _xx = np.ogrid[-5:6, -5:6]
+_PROXIMITY_SELEM = (_xx * _xx + _yy * _yy) <= 25
+
+
+def _get_scratch(name, shape, dtype):
+    """
+    Return a cached scratch array of the given shape/dtype, reallocating
+    only when the tile dimensions change.
+    """
+    arr = _scratch.get(name)
+    if arr is None or arr.shape != shape or arr.dtype != np.dtype(dtype):
+        arr = np.empty(shape, dtype=dtype)
+        _scratch[name] = arr
+    return arr
+
+
+def _get_bbox(ds):
+    """
+    Get raster dataset and create bbox for it
+    :param ds: gdal dataset
+    :return: bbox
+    """
+    xmin, xpixel, _, ymax, _, ypixel = ds.GetGeoTransform()
+    width, height = ds.RasterXSize, ds.RasterYSize
+    xmax = xmin + width * xpixel
+    ymin = ymax + height * ypixel
+
+    raster_bounds = ogr.Geometry(ogr.wkbLinearRing)
+    raster_bounds.AddPoint(xmin, ymin)
+    raster_bounds.AddPoint(xmax, ymin)
+    raster_bounds.AddPoint(xmax, ymax)
+    raster_bounds.AddPoint(xmin, ymax)
+    raster_bounds.AddPoint(xmin, ymin)
+    bbox = ogr.Geometry(ogr.wkbPolygon)
+    bbox.AddGeometry(raster_bounds)
+
+    return bbox
+
+
+# Read-only source datasets (landcover, false mask) opened once per worker
+# process; reopening them for every CHMAP re-parsed the TIFF IFD and block
+# index each time
+_source_cache = {}
+
+
+def _open_source(path):
+    """
+    Open a read-only raster once per process and cache the dataset handle
+    together with its first band, inverse geotransform and bbox.
+    """
+    cached = _source_cache.get(path)
+    if cached is None:
+        ds = gdal.OpenEx(path, gdal.OF_READONLY | gdal.OF_RASTER)
+        if ds is None:
+            return None
+        cached = (ds, ds.GetRasterBand(1),
+                  gdal.InvGeoTransform(ds.GetGeoTransform()), _get_bbox(ds))
+        _source_cache[path] = cached
+    return cached
+
+
+@lru_cache(maxsize=1024)
+def _parse_product_name(fname):
+    """
+    Split an L3A product file name (stem, no extension) into the tile id,
+    the Jalali yyyymm string and the Jalali year/month. Memoized because the
+    same products come back every scheduler run and the strptime plus
+    Gregorian-to-Jalali conversion is pure Python overhead each time.
+    """
+    platform, date_obj, product, tile, c, version, frc, ftype = fname.split('_')
+    date_time_str = date_obj.split('-')[0]
+
+    jalili_date = jdatetime.date.fromgregorian(date=datetime.strptime(date_time_str, '%Y%m%d'))
+
+    yyyymm = jalili_date.strftime("%Y%m")
+
+    return tile, yyyymm, jalili_date.year, jalili_date.month
+
+
+@lru_cache(maxsize=8)
+def _request_token(address, username, password):
+    """
+    Fetch a JWT from the WebApp. Memoized so repeated DecTree instances in
+    the same process (e.g. under a scheduler) share one token instead of
+    re-authenticating every run.
+    """
+    token_url = f'{address}/gcms/auth/jwt/create'
+    headers = {'Content-type': 'application/json', 'Accept': 'application/json'}
+    auth_data = {
+        'email': username,
+        'password': password
+    }
+    resp = requests.post(token_url, data=json.dumps(auth_data), headers=headers).json()
+
+    return resp['access'] if 'access' in resp else None
+
+
+def process_one(chmap, bin_file_path, landcover, false_mask):
+    """
+    Process a single CHMAP into its binary change map. Module-level (not a
+    method) so it stays picklable for the process pool in DecTree.run.
+    """
+    logger = logging.getLogger("root")
+
+    lc_src = _open_source(landcover)
+    if lc_src is None:
+        logger.info(f'Unable to open {landcover}')
+        sys.exit(1)
+
+    # The inverse geotransform is used to convert lon/lat degrees to x/y pixel index
+    lc_ds, lc_band, lc_inv_geotrans, lc_bbox = lc_src
+
+    fm_src = _open_source(false_mask)
+    if fm_src is None:
+        logger.info(f'Unable to open {false_mask}')
+        sys.exit(1)
+
+    # Get the first input raster band
+    fm_ds, fm_band, _, _ = fm_src
+
+    # Sentinel-2 L3A CHMAPs are often already on the EPSG:3857 10 m grid;
+    # in that case the full resampling pipeline is a no-op and the source
+    # can be processed directly
+    src_ds = gdal.Open(chmap, gdal.GA_ReadOnly)
+    src_gt = src_ds.GetGeoTransform()
+    src_wkt = src_ds.GetProjection()
+    if src_wkt and osr.SpatialReference(wkt=src_wkt).IsSame(_TARGET_SRS) \
+            and src_gt[1] == 10 and src_gt[5] == -10:
+        logger.debug(f'CHMAP already in EPSG:3857 at 10 m, skipping Warp.')
+        trg_fname = None
+        trg_ds = src_ds
+    else:
+        # Reproject into GDAL's in-memory filesystem: the warped raster is
+        # read back immediately, so there is no reason to round-trip it
+        # through disk
+        src_ds = None
+        trg_fname = f'/vsimem/CHMAP_3857_{uuid.uuid4().hex}.tif'
+        trg_ds = gdal.Warp(trg_fname, chmap, dstSRS='EPSG:3857', format='GTiff', xRes=10, yRes=10)
+
+    trg_geoTrans = trg_ds.GetGeoTransform()
+    logger.debug(f'Orginal GeoTransform: {trg_geoTrans}')
+
+    trg_nbands = trg_ds.RasterCount        # Number of bands
+    trg_projection = trg_ds.GetProjection()      # Projection
+
+    # Get raster bbox
+    trg_bbox = _get_bbox(trg_ds)
+
+    # Get intersection between two geometry
+    intersection = lc_bbox.Intersection(trg_bbox)
+
+    # Check if two geom have intersection
+    if intersection is not None and intersection.Area() > 0:
+
+        # Get bound of overlap
+        bounds_geo = intersection.Boundary()
+
+        # Get extent of input raster
+        xmin_sub, xmax_sub, ymin_sub, ymax_sub = bounds_geo.GetEnvelope()
+
+        # Create a new geomatrix for the image
+        new_trg_geoTrans = list(trg_geoTrans)
+        new_trg_geoTrans[0] = xmin_sub
+        new_trg_geoTrans[3] = ymax_sub
+        logger.debug(f'New GeoTransform: {trg_geoTrans}')
+
+        # The inverse geotransform is used to convert lon/lat degrees to x/y pixel index
+        trg_inv_geotrans = gdal.InvGeoTransform(trg_geoTrans)
+
+        # Convert lon/lat degrees to x/y pixel for the dataset
+        ulX_sub, ulY_sub = gdal.ApplyGeoTransform(trg_inv_geotrans, xmin_sub, ymax_sub)
+        lrX_sub, lrY_sub = gdal.ApplyGeoTransform(trg_inv_geotrans, xmax_sub, ymin_sub)
+
+        xsize_sub = int(lrX_sub - ulX_sub)
+        ysize_sub = int(lrY_sub - ulY_sub)
+
+        # Convert lon/lat degrees to x/y pixel for the dataset
+        ulX, ulY = gdal.ApplyGeoTransform(lc_inv_geotrans, xmin_sub, ymax_sub)
+        lrX, lrY = gdal.ApplyGeoTransform(lc_inv_geotrans, xmax_sub, ymin_sub)
+
+        xsize = int(lrX - ulX)
+        ysize = int(lrY - ulY)
+
+        # Stream the heavy band data in windows aligned with the file's
+        # internal tiling, so GDAL decodes every TIFF block exactly once
+        # instead of allocating one giant buffer for the whole sub-window
+        blk_xsize, blk_ysize = lc_band.GetBlockSize()
+
+        lc_dtype = gdal_array.GDALTypeCodeToNumericTypeCode(lc_band.DataType)
+
+        # Full-size mask/landcover arrays are kept for the proximity step;
+        # they are one byte per pixel, unlike the five-band float stack.
+        # Every pixel is written by the block loop, so no zero-fill needed
+        total_change_strong = _get_scratch('strong', (ysize, xsize), bool)
+        total_change_weak = _get_scratch('weak', (ysize, xsize), bool)
+        lc_sub_array = _get_scratch('lc', (ysize, xsize), lc_dtype)
+        mask_fchm = _get_scratch('fchm', (ysize, xsize), bool)
+
+        # A small pool of recycled buffer sets bounds memory: the reader
+        # thread takes a set, fills it from GDAL, and the compute side hands
+        # it back once the kernel is done with it. Edge windows are smaller
+        # and simply let ReadAsArray allocate their own arrays.
+        # Have GDAL downcast the bands to float32 while reading: the
+        # thresholds fit easily, and halving the bytes per pixel halves the
+        # memory bandwidth the kernel has to chew through
+        free_q = queue.Queue()
+        for p in range(_PIPELINE_DEPTH):
+            free_q.put((_get_scratch(f'lc_blk{p}', (blk_ysize, blk_xsize), lc_dtype),
+                        _get_scratch(f'fm_blk{p}', (blk_ysize, blk_xsize), lc_dtype),
+                        _get_scratch(f'stack_blk{p}', (trg_nbands, blk_ysize, blk_xsize), np.float32)))
+
+        # Overlap the GDAL block reads with the compiled mask computation:
+        # one reader thread streams windows into a bounded queue while this
+        # thread runs the kernel. GDAL I/O and the nogil kernels both release
+        # the GIL, so the two stages genuinely run concurrently. All GDAL
+        # access stays on the reader thread, so no dataset is ever touched
+        # from two threads at once; there is no per-block write stage since
+        # the proximity rewrite left only one end-of-window WriteArray.
+        work_q = queue.Queue(maxsize=_PIPELINE_DEPTH)
+
+        def _read_blocks():
+            for yoff in range(0, ysize, blk_ysize):
+                win_ysize = min(blk_ysize, ysize - yoff)
+                for xoff in range(0, xsize, blk_xsize):
+                    win_xsize = min(blk_xsize, xsize - xoff)
+                    full_block = win_xsize == blk_xsize and win_ysize == blk_ysize
+                    bufs = free_q.get() if full_block else None
+                    lc_buf, fm_buf, stack_buf = bufs if full_block else (None, None, None)
+
+                    # Get subset of the rasters as numpy arrays
+                    lc_blk = lc_band.ReadAsArray(int(ulX) + xoff, int(ulY) + yoff,
+                                                 win_xsize, win_ysize, buf_obj=lc_buf)
+                    fm_blk = fm_band.ReadAsArray(int(ulX) + xoff, int(ulY) + yoff,
+                                                 win_xsize, win_ysize, buf_obj=fm_buf)
+
+                    # One dataset-level read fetches all five bands of the
+                    # window in a single GDAL call; the unpacked bands are
+                    # views into the stack, not copies
+                    if full_block:
+                        stack_blk = trg_ds.ReadAsArray(int(ulX_sub) + xoff, int(ulY_sub) + yoff,
+                                                       win_xsize, win_ysize, buf_obj=stack_buf)
+                    else:
+                        stack_blk = trg_ds.ReadAsArray(int(ulX_sub) + xoff, int(ulY_sub) + yoff,
+                                                       win_xsize, win_ysize, buf_type=gdal.GDT_Float32)
+
+                    work_q.put((xoff, yoff, win_xsize, win_ysize, lc_blk, fm_blk, stack_blk, bufs))
+            work_q.put(None)
+
+        reader = threading.Thread(target=_read_blocks, daemon=True)
+        reader.start()
+
+        while True:
+            item = work_q.get()
+            if item is None:
+                break
+            xoff, yoff, win_xsize, win_ysize, lc_blk, fm_blk, stack_blk, bufs = item
+
+            blue_band, green_band, red_band, nir_band, kisqr_band = stack_blk
+
+            strong_blk = total_change_strong[yoff:yoff + win_ysize, xoff:xoff + win_xsize]
+            weak_blk = total_change_weak[yoff:yoff + win_ysize, xoff:xoff + win_xsize]
 
+            # Evaluate the whole decision tree for this block in one
+            # compiled pass, writing straight into the full-size masks
+            change_masks(blue_band, red_band, nir_band, kisqr_band,
+                         lc_blk, strong_blk, weak_blk)
 
+            lc_sub_array[yoff:yoff + win_ysize, xoff:xoff + win_xsize] = lc_blk
+            mask_fchm[yoff:yoff + win_ysize, xoff:xoff + win_xsize] = fm_blk == 1
 
+            # Hand the buffer set back so the reader can refill it
+            if bufs is not None:
+                free_q.put(bufs)
+
+        reader.join()
+
+        logger.debug(f'Cropped the Landcover image based on tile number.')
+        logger.debug(f'Cropped the False Mask image based on tile number.')
+
+        # "Within 5 px of a strong-change pixel" used to be answered by
+        # writing a sum-change GTiff, running gdal.ComputeProximity and
+        # reading the result back. A binary dilation of the strong mask with
+        # the radius-5 disk answers the same question in one in-memory pass
+        near_strong = ndimage.binary_dilation(total_change_strong, structure=_PROXIMITY_SELEM)
+        logger.debug(f'Strong-change neighbourhood mask is successfully created.')
+
+        # Assign class labels in one fused pass instead of a fill plus three
+        # scatter passes over final_array; uint8 matches the GDT_Byte output
+        # band, so WriteArray hands the buffer to GDAL without a cast
+        final_array = _get_scratch('final', lc_sub_array.shape, np.uint8)
+        assign_labels(total_change_weak, near_strong, lc_sub_array, mask_fchm, final_array)
+
+        driver = gdal.GetDriverByName('GTiff')
+        # Tiled output with multi-threaded compression, so the final write
+        # parallelizes too
+        bin_ds = driver.Create(bin_file_path, xsize, ysize, 1, gdal.GDT_Byte,
+                               options=['COMPRESS=LZW', 'TILED=YES', 'BLOCKXSIZE=512',
+                                        'BLOCKYSIZE=512', 'NUM_THREADS=ALL_CPUS'])
+        bin_ds.SetGeoTransform(new_trg_geoTrans)
+
+        # Create for target raster the same projection as for the value raster
+        bin_ds.SetProjection(trg_projection)
+
+        bin_band = bin_ds.GetRasterBand(1)
+        bin_band.SetNoDataValue(255)
+        bin_band.WriteArray(final_array)
+
+        # Remove cache files; the landcover/false-mask bands stay open and
+        # warm in the per-process cache
+        bin_band.FlushCache()
+
+        bin_ds = None  # Close the final binary dataset
+
+    trg_ds = None  # Close the warp (or source) GDAL dataset
+    if trg_fname is not None:
+        gdal.Unlink(trg_fname)
+
+    return bin_file_path
 
 
 
@@ -22,9 +364,9 @@ from requests.exceptions import HTTPError
 class DecTree:
 
     version = 2023.09
-    def __init__(self, address:str, username:str, password:str, input:str, output:str, 
+    def __init__(self, address:str, username:str, password:str, input:str, output:str,
                  landcover:str, false_mask:str, seed_db:bool, **kwargs) -> None:
-        
+
         self.logger = kwargs.get("logger", logging.getLogger("root"))
         self.logger.info(f'======================= This is DecTree v{self.version} ======================')
 
@@ -33,19 +375,30 @@ class DecTree:
         self.output_base_dir = output
         self.landcover = landcover
         self.false_mask = false_mask
-        
+        self.seed_db = None
+
         # datebase connection params
         if seed_db and address and username and password:
             self.url_bin = f'{address}/gcms/api/TreeCoverLossRaster/'
             self.url_nrgb = f'{address}/gcms/api/Sentinel2Raster/'
-            auth_token = self.__get_token(address, username , password)
-            self.headers = {'Accept': 'application/json', 'Authorization': 'JWT {}'.format(auth_token)}
 
-            self.seed_db = None
+            # One session for all outbound HTTP so connections are kept alive
+            # and reused across the token request, the probe and the uploads
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                                  max_retries=Retry(total=3, backoff_factor=0.3))
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+            auth_token = _request_token(address, username , password)
+            self.headers = {'Accept': 'application/json', 'Authorization': 'JWT {}'.format(auth_token)}
+            self.session.headers.update(self.headers)
 
             if auth_token:
                 try:
-                    response = requests.get(self.url_bin, headers=self.headers)
+                    # HEAD is enough to verify auth - no point downloading
+                    # and parsing the whole endpoint listing on every startup
+                    response = self.session.head(self.url_bin, timeout=5, allow_redirects=False)
                     # If the response was successful, no Exception will be raised
                     response.raise_for_status()
 
@@ -95,283 +448,76 @@ class DecTree:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
         dectree_logger.addHandler(console_handler)
-        
-        return dectree_logger
 
-
-    def __getBBox(self, ds):
-        """
-        Get raster dataset and create bbox for it
-        :param ds: gdal dataset
-        :return: bbox
-        """
-        xmin, xpixel, _, ymax, _, ypixel = ds.GetGeoTransform()
-        width, height = ds.RasterXSize, ds.RasterYSize
-        xmax = xmin + width * xpixel
-        ymin = ymax + height * ypixel
-
-        raster_bounds = ogr.Geometry(ogr.wkbLinearRing)
-        raster_bounds.AddPoint(xmin, ymin)
-        raster_bounds.AddPoint(xmax, ymin)
-        raster_bounds.AddPoint(xmax, ymax)
-        raster_bounds.AddPoint(xmin, ymax)
-        raster_bounds.AddPoint(xmin, ymin)
-        bbox = ogr.Geometry(ogr.wkbPolygon)
-        bbox.AddGeometry(raster_bounds)
-
-        return bbox
-
-
-    def __get_token(self, address, username, password):
-        token_url = f'{address}/gcms/auth/jwt/create'
-        headers = {'Content-type': 'application/json', 'Accept': 'application/json'}
-        auth_data = {
-            'email': username,
-            'password': password
-        }
-        resp = requests.post(token_url, data=json.dumps(auth_data), headers=headers).json()
-
-        return resp['access'] if 'access' in resp else None
-    
-
-    def __process_chmap(self, temp_dir:str, chmap:str, bin_file_path:str):
-        lc_ds = gdal.Open(self.landcover, gdal.GA_ReadOnly)
-        if lc_ds is None:
-            self.logger.info(f'Unable to open {self.landcover}')
-            sys.exit(1)
-        
-        # Get the first input raster band
-        lc_band = lc_ds.GetRasterBand(1)
-        # Get raster bbox
-        lc_bbox = self.__getBBox(lc_ds)
-        # The inverse geotransform is used to convert lon/lat degrees to x/y pixel index
-        lc_geotrans = lc_ds.GetGeoTransform()
-        lc_inv_geotrans = gdal.InvGeoTransform(lc_geotrans)
-
-        # Open input raster by gdal
-        fm_ds = gdal.Open(self.false_mask, gdal.GA_ReadOnly)
-        if fm_ds is None:
-            self.logger.info(f'Unable to open {self.false_mask}')
-            sys.exit(1)
-
-        # Get the first input raster band
-        fm_band = fm_ds.GetRasterBand(1)
-
-        
-
-        trg_fname = os.path.join(temp_dir, 'CHMAP_3857_temp.tif')
-        trg_ds = gdal.Warp(trg_fname, chmap, dstSRS='EPSG:3857', format='GTiff', xRes=10, yRes=10)
-
-        trg_geoTrans = trg_ds.GetGeoTransform()
-        self.logger.debug(f'Orginal GeoTransform: {trg_geoTrans}')
-
-        trg_nbands = trg_ds.RasterCount        # Number of bands
-        trg_projection = trg_ds.GetProjection()      # Projection
-
-        # Get raster bbox
-        trg_bbox = self.__getBBox(trg_ds)
-
-        # Get intersection between two geometry
-        intersection = lc_bbox.Intersection(trg_bbox)
-
-        # Check if two geom have intersection
-        if intersection is not None and intersection.Area() > 0:
-
-            # Get bound of overlap
-            bounds_geo = intersection.Boundary()
-
-            # Get extent of input raster
-            xmin_sub, xmax_sub, ymin_sub, ymax_sub = bounds_geo.GetEnvelope()
-
-            # Create a new geomatrix for the image
-            new_trg_geoTrans = list(trg_geoTrans)
-            new_trg_geoTrans[0] = xmin_sub
-            new_trg_geoTrans[3] = ymax_sub
-            self.logger.debug(f'New GeoTransform: {trg_geoTrans}')
-
-            # The inverse geotransform is used to convert lon/lat degrees to x/y pixel index
-            trg_inv_geotrans = gdal.InvGeoTransform(trg_geoTrans)
-
-            # Convert lon/lat degrees to x/y pixel for the dataset
-            ulX_sub, ulY_sub = gdal.ApplyGeoTransform(trg_inv_geotrans, xmin_sub, ymax_sub)
-            lrX_sub, lrY_sub = gdal.ApplyGeoTransform(trg_inv_geotrans, xmax_sub, ymin_sub)
-
-            xsize_sub = int(lrX_sub - ulX_sub)
-            ysize_sub = int(lrY_sub - ulY_sub)
-
-            # Convert lon/lat degrees to x/y pixel for the dataset
-            ulX, ulY = gdal.ApplyGeoTransform(lc_inv_geotrans, xmin_sub, ymax_sub)
-            lrX, lrY = gdal.ApplyGeoTransform(lc_inv_geotrans, xmax_sub, ymin_sub)
-
-            xsize = int(lrX - ulX)
-            ysize = int(lrY - ulY)
-
-            # Get subset of the raster as a numpy array
-            lc_sub_array = lc_band.ReadAsArray(int(ulX), int(ulY), xsize, ysize)
-            self.logger.debug(f'Cropped the Landcover image based on tile number.')
-            
-            # Get subset of the raster as a numpy array
-            fm_sub_array = fm_band.ReadAsArray(int(ulX), int(ulY), xsize, ysize)
-            mask_fchm = fm_sub_array == 1
-            self.logger.debug(f'Cropped the False Mask image based on tile number.')
-
-            image_bands = []
-            for b in range(trg_nbands):
-                trg_band = trg_ds.GetRasterBand(b + 1)
-                image_bands.append(trg_band.ReadAsArray(int(ulX_sub), int(ulY_sub), xsize_sub, ysize_sub))
-
-            blue_band, green_band, red_band, nir_band, kisqr_band = image_bands
-
-            # All changes strong
-            total_change_strong = np.logical_and(
-                np.logical_and(
-                    np.logical_and(blue_band < 10.0, blue_band > 2.0),
-                    np.logical_and(red_band < -1.0, red_band > -5.0)),
-                np.logical_and(
-                    np.logical_and(nir_band < -1.0, nir_band > -5.0),
-                    np.logical_and(kisqr_band < 1500, kisqr_band > 150))
-            )
-
-            # All changes weak
-            total_change_weak = np.logical_and(
-                np.logical_and(
-                    np.logical_and(blue_band < 11.0, blue_band > 1.0),
-                    np.logical_and(red_band < -0.0, red_band > -6.0)),
-                np.logical_and(
-                    np.logical_and(nir_band < -0.0, nir_band > -6.0),
-                    np.logical_and(kisqr_band < 2000, kisqr_band > 100))
-            )
-
-            # No data mask
-            nodata_mask = kisqr_band >= 2000
-
-            # Mask out other classes
-            other_classes = np.isin(lc_sub_array, [2, 3, 4, 5, 6])
-
-            # Mask out unchanged pixels strong
-            total_change_strong[other_classes] = 0
-            total_change_strong[nodata_mask] = 0
-
-            # Mask out unchanged pixels weak
-            total_change_weak[other_classes] = 0
-            total_change_weak[nodata_mask] = 0
-
-            sum_change = np.add(total_change_strong, total_change_weak, dtype=int)
-            self.logger.debug(f'Sum change image is successfully created.')
-
-            # Write the output into geotiff image.
-            sum_fname = os.path.join(temp_dir, 'sum_change_temp.tif')
-            drv = gdal.GetDriverByName('GTiff')
-            sum_ds = drv.Create(sum_fname, xsize, ysize, 1, gdal.GDT_Byte, options=['COMPRESS=LZW'])
-            sum_ds.SetGeoTransform(new_trg_geoTrans)
-            sum_ds.SetProjection(trg_projection)
-            sum_band = sum_ds.GetRasterBand(1)
-            sum_band.WriteArray(sum_change)
-
-            self.logger.debug(f'Sum Change with name {sum_fname} is created.')
-
-            prx_fname = os.path.join(temp_dir, 'proxy_temp.tif')
-            prx_ds = drv.Create(prx_fname, xsize, ysize, 1, gdal.GDT_Byte, options=['COMPRESS=LZW'])
-            prx_ds.SetGeoTransform(new_trg_geoTrans)
-            prx_ds.SetProjection(trg_projection)
-            prx_band = prx_ds.GetRasterBand(1)
-            self.logger.debug(f'Proxy with name {prx_fname} is created.')
-
-            gdal.ComputeProximity(sum_band, prx_band,
-                    options=["VALUES=2", "MAXDIST=5", "DISTUNITS=PIXEL", "NODATA=255", "FIXED_BUF_VAL=0"], callback=None) #gdal.TermProgress
-
-            prx_array = prx_band.ReadAsArray()
-
-            total_change = np.logical_and(total_change_weak, prx_array==0)
-
-            # Forest changes
-            forest_changes = np.logical_and(total_change, lc_sub_array==0)
-
-            # Rangeland changes
-            rangeland_changes = np.logical_and(total_change, lc_sub_array==1)
-
-            # Assign class labels
-            final_array = np.full(lc_sub_array.shape, 255, dtype=int)
-            final_array[forest_changes] = 0
-            final_array[rangeland_changes] = 1
-            
-            final_array[mask_fchm] = 255
-
-            driver = gdal.GetDriverByName('GTiff')
-            bin_ds = driver.Create(bin_file_path, xsize, ysize, 1, gdal.GDT_Byte, options=['COMPRESS=LZW'])
-            bin_ds.SetGeoTransform(new_trg_geoTrans)
-
-            # Create for target raster the same projection as for the value raster
-            bin_ds.SetProjection(trg_projection)
-
-            bin_band = bin_ds.GetRasterBand(1)
-            bin_band.SetNoDataValue(255)
-            bin_band.WriteArray(final_array)
-
-            # Remove cache files
-            lc_band.FlushCache()
-            fm_band.FlushCache()
-            trg_band.FlushCache()
-            sum_band.FlushCache()
-            prx_band.FlushCache()
-            bin_band.FlushCache()
-
-            # Remove temporary files and directory
-            trg_ds = None  # Close the wrap GDAL dataset
-            sum_ds = None  # Close the temporary GDAL dataset
-            prx_ds = None  # Close the proximity dataset
-            bin_ds = None  # Close the final binary dataset
-        
-        return None
+        return dectree_logger
 
 
-    def __db_seeder(self, temp_dir, image_path, ptype):
+    def __db_seeder(self, image_path, ptype):
 
         base_dir, ext = os.path.splitext(image_path)
         base_dir, fname = os.path.split(base_dir)
         self.logger.debug(f'File path: {image_path}')
         self.logger.debug(f'Split file path into base and file name: {base_dir}, {fname}')
 
-        platform, date_obj, product, tile, c, version, frc, ftype = fname.split('_')
-        date_time_str = date_obj.split('-')[0]
-
-        jalili_date =  jdatetime.date.fromgregorian(date=datetime.strptime(date_time_str, '%Y%m%d'))
-
-        yyyymm = jalili_date.strftime("%Y%m")
+        tile, yyyymm, jalili_year, jalili_month = _parse_product_name(fname)
 
         pname = ''.join(['_'.join([ptype, yyyymm, tile]), '.tif']) #CHMAP_139802_39SUB.tif
 
         zfname = ''.join(['_'.join([ptype, yyyymm, tile]), '.zip']) #CHMAP_139802_39SUB.zip
 
-        zf = zipfile.ZipFile(os.path.join(temp_dir, zfname), "w", zipfile.ZIP_DEFLATED)
-
-        zf.write(image_path, pname)
-        zf.close()
+        # The GeoTIFF is already LZW-compressed, so deflating it again burns
+        # CPU for near-zero size gain; store it uncompressed and spool the
+        # archive in memory so small files never touch disk
+        buf = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as zf:
+            zf.write(image_path, pname)
+        buf.seek(0)
         self.logger.debug(f'Zipfile created with Id: {zfname}.')
 
         data = {
-            'year': jalili_date.year,
-            'month': jalili_date.month,
+            'year': jalili_year,
+            'month': jalili_month,
             'scene_name': tile
         }
         self.logger.debug(data)
 
-        files = {'zip_file': open(os.path.join(temp_dir, zfname), 'rb')}
-
-        if ptype == 'CHMAP':
-            resp =  requests.post(self.url_bin, data=data, headers=self.headers, files=files)
-            self.logger.info(resp.text)
-        else:
-            resp =  requests.post(self.url_nrgb, data=data, headers=self.headers, files=files)
+        try:
+            # Stream the multipart body in small chunks so the POST never
+            # buffers the whole archive in memory, however big the raster
+            encoder = MultipartEncoder(fields={
+                'year': str(jalili_year),
+                'month': str(jalili_month),
+                'scene_name': tile,
+                'zip_file': (zfname, buf, 'application/zip')
+            })
+            url = self.url_bin if ptype == 'CHMAP' else self.url_nrgb
+            resp = self.session.post(url, data=encoder,
+                                     headers={'Content-Type': encoder.content_type}, stream=True)
             self.logger.info(resp.text)
-    
+        finally:
+            buf.close()
+
         return resp
 
 
+    def __seed_outputs(self, nrgb_file_path, bin_file_path, nrgb_name, bname):
+        self.logger.info(f'DecTree will update database with this NRGB image: {nrgb_name}')
+        self.logger.info(f'DecTree will update database with this BIN map: {bname}')
+
+        self.__db_seeder(nrgb_file_path, 'SENTINEL2')
+        self.__db_seeder(bin_file_path, 'CHMAP')
+
+
 
     def run(self):
-        tiles = os.listdir(self.input_base_dir)
+        # scandir caches the entry type, so filtering costs no extra stat()
+        # calls; sorted output keeps the process-pool schedule reproducible
+        tiles = sorted(e.name for e in os.scandir(self.input_base_dir) if e.is_dir())
         self.logger.info(f'DecTree found these tiles: {tiles}')
+
+        # Collect the CHMAPs that still need processing; the ones that exist
+        # already only need their (optional) database upload
+        jobs = []
         for tile in tiles:
             out_dir = os.path.join(self.output_base_dir, tile)
 
@@ -379,7 +525,11 @@ class DecTree:
                 os.makedirs(out_dir)
 
             chmap_paths = os.path.join(self.input_base_dir, tile)
-            chmaps = os.listdir(chmap_paths)
+            # Drop hidden files, .aux.xml sidecars and other non-CHMAP junk
+            # up front instead of letting each one reach gdal.Warp; the
+            # product names carry CHMAP at the end (..._FRC_CHMAP.tif)
+            chmaps = sorted(e.name for e in os.scandir(chmap_paths)
+                            if e.is_file() and 'CHMAP' in e.name and e.name.endswith('.tif'))
             self.logger.info(f'DecTree found these CHMAP images: {chmaps} for this tile: {tiles}')
             for file in chmaps:
                 chmap_file_path = os.path.join(chmap_paths, file)
@@ -387,40 +537,46 @@ class DecTree:
                 bname = file.replace('CHMAP', 'BIN')
                 bin_file_path = os.path.join(out_dir, bname)
 
-                # Create a temporary directory to store intermediate files
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    self.logger.info(f'Temporary directory was created at: {temp_dir}')
-
-                    nrgb_name = file.replace('CHMAP', 'NRGB')
-                    product_dir = '_'.join(nrgb_name.split('_')[:6])
-                    nrgb_file_path = os.path.join(out_dir.replace('CHBIN', 'L3A'), product_dir, nrgb_name)
+                nrgb_name = file.replace('CHMAP', 'NRGB')
+                product_dir = '_'.join(nrgb_name.split('_')[:6])
+                nrgb_file_path = os.path.join(out_dir.replace('CHBIN', 'L3A'), product_dir, nrgb_name)
 
-                    if not os.path.exists(bin_file_path):
-                            self.logger.info('Create file %s' % bin_file_path)
+                if not os.path.exists(bin_file_path):
+                    self.logger.info('Create file %s' % bin_file_path)
+                    jobs.append((chmap_file_path, bin_file_path, nrgb_file_path, nrgb_name, bname))
 
-                            self.__process_chmap(temp_dir, chmap_file_path, bin_file_path)
-
-                            if self.seed_db:
-                                
-                                self.logger.info(f'DecTree will update database with this NRGB image: {nrgb_name}')
-                                self.logger.info(f'DecTree will update database with this BIN map: {bname}')
-
-                                self.__db_seeder(temp_dir, nrgb_file_path, 'SENTINEL2')
-                                self.__db_seeder(temp_dir, bin_file_path, 'CHMAP')
-
-                    else:
-                        self.logger.info(f'This file has already been created at: {bin_file_path}')
-                        if self.seed_db:
-                            self.logger.info(f'The database connection was successfully made to the server with IP: {self.url_bin}')
-
-                            self.logger.info(f'DecTree will update database with this NRGB image: {nrgb_name}')
-                            self.logger.info(f'DecTree will update database with this BIN map: {bname}')
-
-                            self.__db_seeder(temp_dir, nrgb_file_path, 'SENTINEL2')
-                            self.__db_seeder(temp_dir, bin_file_path, 'CHMAP')
+                else:
+                    self.logger.info(f'This file has already been created at: {bin_file_path}')
+                    if self.seed_db:
+                        self.logger.info(f'The database connection was successfully made to the server with IP: {self.url_bin}')
+                        self.__seed_outputs(nrgb_file_path, bin_file_path, nrgb_name, bname)
+
+        # The CHMAPs are independent, and GDAL is safer across processes than
+        # across threads, so fan them out to one worker per CPU. The database
+        # uploads stay in the parent so the POSTs remain serialized.
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+            futures = {pool.submit(process_one, chmap_file_path, bin_file_path,
+                                   self.landcover, self.false_mask): (bin_file_path, nrgb_file_path, nrgb_name, bname)
+                       for chmap_file_path, bin_file_path, nrgb_file_path, nrgb_name, bname in jobs}
+
+            for future in as_completed(futures):
+                bin_file_path, nrgb_file_path, nrgb_name, bname = futures[future]
+                future.result()
+
+                if self.seed_db:
+                    self.__seed_outputs(nrgb_file_path, bin_file_path, nrgb_name, bname)
 
 def main():
 
+    # Let GDAL parallelize the warper and LZW (de)compression, give it a
+    # 1 GB block cache so hot tiles stay resident across the windowed reads,
+    # and skip directory scans / sidecar probing when opening the rasters
+    gdal.SetConfigOption('GDAL_NUM_THREADS', 'ALL_CPUS')
+    gdal.SetCacheMax(1024 * 1024 * 1024)
+    gdal.SetConfigOption('GDAL_TIFF_INTERNAL_MASK', 'YES')
+    gdal.SetConfigOption('GDAL_DISABLE_READDIR_ON_OPEN', 'EMPTY_DIR')
+    gdal.SetConfigOption('CPL_VSIL_CURL_ALLOWED_EXTENSIONS', '.tif')
+
     parser = argparse.ArgumentParser(description="Perfrom DecTree to extract forest binary change map from iMad outputs.")
 
     parser.add_argument("-a", "--address", type=str, help="WebApp address")
@@ -430,7 +586,7 @@ def main():
     parser.add_argument("-o", "--output", type=str, help="Where is your preferred direction to store change maps?")
     parser.add_argument("-l", "--landcover", type=str, help="Landcover map")
     parser.add_argument("-m", "--false_mask", type=str, help="False mask map")
-    parser.add_argument("-s", "--seed_db", help="Upload output to the WebApp database. Default is fals", 
+    parser.add_argument("-s", "--seed_db", help="Upload output to the WebApp database. Default is fals",
                         default=False, action="store_true")
     parser.add_argument("-v", "--verbose", help="Provides detailed (DEBUG) logging for DecTree. Default is false",
                         default=False, action="store_true")
@@ -442,6 +598,6 @@ def main():
     logger = DecTree.init_loggers(msg_level=logging_level)
 
 
-    tree = DecTree(args.address, args.username, args.password, args.input, args.output, 
+    tree = DecTree(args.address, args.username, args.password, args.input, args.output,
                    args.landcover, args.false_mask, args.seed_db, logger=logger)
     tree.run()
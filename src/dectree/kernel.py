@@ -0,0 +1,96 @@
+"""
+Compiled per-pixel kernels for the DecTree decision tree.
+
+The thresholds are inlined as literals so LLVM constant-folds them into
+immediate operands of the SIMD compares. By default the kernels are JIT
+compiled with @njit(cache=True) on first use; running
+
+    python -m dectree.kernel
+
+builds an ahead-of-time extension (_kernel_aot) with numba.pycc that this
+module picks up on import, removing the JIT warm-up entirely. The AOT
+signatures assume float32 bands and Byte landcover/false-mask rasters,
+which is what core.py reads.
+"""
+import os
+from numba import njit, prange
+
+
+def _change_masks_impl(blue, red, nir, kisqr, lc, strong, weak):
+    """
+    Per-pixel decision-tree kernel: evaluate the strong/weak change range
+    tests and the landcover/nodata masking in one fused pass, writing into
+    the preallocated strong/weak output arrays.
+    """
+    for i in prange(strong.shape[0]):
+        for j in range(strong.shape[1]):
+            b = blue[i, j]
+            r = red[i, j]
+            n = nir[i, j]
+            k = kisqr[i, j]
+
+            # Other classes (codes 2..6) and nodata pixels carry no change
+            if (2 <= lc[i, j] <= 6) or k >= 2000:
+                strong[i, j] = False
+                weak[i, j] = False
+            else:
+                # Each range test lo < x < hi is written as the equivalent
+                # abs(x - mid) < half, one subtract/abs/compare instead of
+                # two compares and an AND; e.g. strong blue (2, 10) becomes
+                # abs(b - 6) < 4
+                strong[i, j] = (abs(b - 6.0) < 4.0 and abs(r + 3.0) < 2.0 and
+                                abs(n + 3.0) < 2.0 and abs(k - 825.0) < 675.0)
+                weak[i, j] = (abs(b - 6.0) < 5.0 and abs(r + 3.0) < 3.0 and
+                              abs(n + 3.0) < 3.0 and abs(k - 1050.0) < 950.0)
+
+
+def _assign_labels_impl(weak, near_strong, lc, fchm, out):
+    """
+    Final labeling kernel: weak changes near a strong change become forest
+    (0) or rangeland (1) depending on landcover, everything else including
+    false-mask pixels is nodata (255) - all in a single pass over the image.
+    """
+    for i in prange(out.shape[0]):
+        for j in range(out.shape[1]):
+            if fchm[i, j] or not (weak[i, j] and near_strong[i, j]):
+                out[i, j] = 255
+            elif lc[i, j] == 0:
+                out[i, j] = 0
+            elif lc[i, j] == 1:
+                out[i, j] = 1
+            else:
+                out[i, j] = 255
+
+
+_jit_flags = dict(parallel=True, cache=True, nogil=True, fastmath=True, boundscheck=False)
+
+change_masks = njit(**_jit_flags)(_change_masks_impl)
+assign_labels = njit(**_jit_flags)(_assign_labels_impl)
+
+try:
+    # Prefer the ahead-of-time build when it has been compiled
+    from dectree import _kernel_aot
+    change_masks = _kernel_aot.change_masks
+    assign_labels = _kernel_aot.assign_labels
+except ImportError:
+    pass
+
+
+def _build_aot():
+    # numba.pycc has no prange support, so the AOT kernels run serial; the
+    # constant-folded SIMD body is identical
+    from numba.pycc import CC
+
+    cc = CC('_kernel_aot')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    cc.export('change_masks',
+              'void(float32[:,:], float32[:,:], float32[:,:], float32[:,:], '
+              'uint8[:,:], boolean[:,:], boolean[:,:])')(_change_masks_impl)
+    cc.export('assign_labels',
+              'void(boolean[:,:], boolean[:,:], uint8[:,:], boolean[:,:], '
+              'uint8[:,:])')(_assign_labels_impl)
+    cc.compile()
+
+
+if __name__ == '__main__':
+    _build_aot()